@@ -37,9 +37,56 @@ takes a list of series and resamples them to their common points.
 import numpy as np
 from scipy import integrate, interpolate, signal
 
+# numba is an optional dependency (see also gw_mismatch). When it is available,
+# we use it to compile some of the loops in this module and in timeseries.
+# There is an overhead in calling (and compiling) numba functions, so we use
+# them only for arrays with at least _NUMBA_MIN_SIZE elements (see _use_numba).
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+
 from kuibit.attr_dict import AttributeDictionary
 from kuibit.numerical import BaseNumerical
 
+_NUMBA_MIN_SIZE = 100000
+
+
+def _use_numba(array):
+    """Return whether numba is available and worth using on ``array``.
+
+    The compiled loops support only arrays of integers or of single and double
+    precision floats in the native byte order (arrays read from HDF5 files, for
+    instance, can be big-endian). All the other arrays have to go through the
+    NumPy implementations.
+
+    """
+    if njit is None or len(array) < _NUMBA_MIN_SIZE:
+        return False
+    dtype = array.dtype
+    return dtype.isnative and (
+        np.issubdtype(dtype, np.integer) or dtype in (np.float32, np.float64)
+    )
+
+
+def _is_strictly_increasing_loop(x):
+    """Return whether the array x is strictly increasing.
+
+    The loop stops at the first element that is not larger than the previous
+    one and does not allocate any array. It is meant to be compiled with numba.
+
+    """
+    for index in range(len(x) - 1):
+        if x[index + 1] <= x[index]:
+            return False
+    return True
+
+
+if njit is not None:
+    _is_strictly_increasing_numba = njit(cache=True)(
+        _is_strictly_increasing_loop
+    )
+
 
 # Note, we test this class testing its derived class TimeSeries
 class BaseSeries(BaseNumerical):
@@ -116,16 +163,23 @@ class BaseSeries(BaseNumerical):
 
         """
         if len(x_array) > 1:
-            # Here we compute directly the diff because it seems faster
-            # than using np.diff
-
-            # Example:
-            # self.x = [1,2,3]
-            # self.x[1:] = [2, 3]
-            # self.x[:-1] = [1, 2]
-            # dx = [1,1]
-            dx = x_array[1:] - x_array[:-1]
-            if dx.min() <= 0:
+            # For large arrays, numba (if available) walks the array only once
+            # and stops at the first element that is out of order, without
+            # computing the differences
+            if _use_numba(x_array):
+                is_increasing = _is_strictly_increasing_numba(x_array)
+            else:
+                # Here we compute directly the diff because it seems faster
+                # than using np.diff
+
+                # Example:
+                # self.x = [1,2,3]
+                # self.x[1:] = [2, 3]
+                # self.x[:-1] = [1, 2]
+                # dx = [1,1]
+                dx = x_array[1:] - x_array[:-1]
+                is_increasing = not dx.min() <= 0
+            if not is_increasing:
                 # HACK: To provide more useful information we assume
                 #       that the derived classes are named like TimeSeries.
                 #       Then, we remove the "series"
@@ -282,7 +336,13 @@ class BaseSeries(BaseNumerical):
 
         dx = self.x[1:] - self.x[:-1]
 
-        return np.allclose(dx, dx[0], atol=1e-14)
+        # This is the same as np.allclose(dx, dx[0], atol=1e-14), but we only
+        # need two reductions instead of creating temporary arrays: all the dx
+        # are close to dx[0] if the largest and the smallest are.
+        tolerance = 1e-14 + 1e-5 * abs(dx[0])
+        return bool(
+            dx.max() - dx[0] <= tolerance and dx[0] - dx.min() <= tolerance
+        )
 
     def __len__(self):
         """The number of data points."""
@@ -446,7 +506,9 @@ class BaseSeries(BaseNumerical):
         copied.invalid_spline = True
         return copied
 
-    def resampled(self, new_x, ext=2, piecewise_constant=False):
+    def resampled(
+        self, new_x, ext=2, piecewise_constant=False, piecewise_linear=False
+    ):
         """Return a new series resampled from this to new_x.
 
         You can specify the details of the spline with the method make_spline.
@@ -454,7 +516,11 @@ class BaseSeries(BaseNumerical):
         If you want to resample without using the spline, and you want a nearest
         neighbor resampling, pass the keyword ``piecewise_constant=True``.
         This may be a good choice for data with large discontinuities, where the
-        splines are ineffective.
+        splines are ineffective. If you want a linear interpolation, pass the
+        keyword ``piecewise_linear=True``. This is much cheaper than building
+        the splines, but it is less accurate for smooth data. In both cases,
+        ``ext`` is ignored and a ``ValueError`` is raised for points outside the
+        data interval.
 
         :param new_x: New independent variable.
         :type new_x:  1D NumPy array or list of float
@@ -463,10 +529,17 @@ class BaseSeries(BaseNumerical):
                    3 for extending the boundary
         :param piecewise_constant: Do not use splines, use the nearest neighbors.
         :type piecewise_constant: bool
+        :param piecewise_linear: Do not use splines, use linear interpolation.
+        :type piecewise_linear: bool
         :returns: Resampled series.
         :rtype:   :py:class:`~.BaseSeries` or derived class
 
         """
+        if piecewise_constant and piecewise_linear:
+            raise ValueError(
+                "piecewise_constant and piecewise_linear are mutually exclusive"
+            )
+
         # If x is the same, there's no need to resample
         if len(self.x) == len(new_x) and np.allclose(self.x, new_x, atol=1e-14):
             return self.copy()
@@ -478,18 +551,29 @@ class BaseSeries(BaseNumerical):
                 self.x, self.y, kind="nearest", assume_sorted=True
             )
             new_y = interp_function(new_x)
+        elif piecewise_linear:
+            new_x = self._make_array(new_x)
+            if new_x.min() < self.xmin or new_x.max() > self.xmax:
+                raise ValueError("Cannot resample outside the data interval")
+            # np.interp works only with real data
+            new_y = np.interp(new_x, self.x, self.y.real)
+            if self.is_complex():
+                new_y = new_y + 1j * np.interp(new_x, self.x, self.y.imag)
         else:
             new_y = self.evaluate_with_spline(new_x, ext=ext)
 
         return type(self)(new_x, new_y)
 
-    def resample(self, new_x, ext=2, piecewise_constant=False):
+    def resample(
+        self, new_x, ext=2, piecewise_constant=False, piecewise_linear=False
+    ):
         """Resample the series to new independent variable new_x.
 
         If you want to resample without using the spline, and you want a nearest
         neighbor resampling, pass the keyword ``piecewise_constant=True``.
         This may be a good choice for data with large discontinuities, where the
-        splines are ineffective.
+        splines are ineffective. If you want a linear interpolation, pass the
+        keyword ``piecewise_linear=True``.
 
         :param new_x: New independent variable.
         :type new_x:  1D NumPy array or list of float
@@ -498,6 +582,8 @@ class BaseSeries(BaseNumerical):
                    3 for extending the boundary
         :param piecewise_constant: Do not use splines, use the nearest neighbors.
         :type piecewise_constant: bool
+        :param piecewise_linear: Do not use splines, use linear interpolation.
+        :type piecewise_linear: bool
 
         """
         self._apply_to_self(
@@ -505,6 +591,7 @@ class BaseSeries(BaseNumerical):
             new_x,
             ext=ext,
             piecewise_constant=piecewise_constant,
+            piecewise_linear=piecewise_linear,
         )
 
     def _apply_binary(self, other, function):
@@ -745,8 +832,8 @@ class BaseSeries(BaseNumerical):
         if self.is_complex():
             return type(self)(
                 self.x,
-                signal.savgol_filter(self.y.imag, window_size, order)
-                + 1j * signal.savgol_filter(self.y.real, window_size, order),
+                signal.savgol_filter(self.y.real, window_size, order)
+                + 1j * signal.savgol_filter(self.y.imag, window_size, order),
                 True,
             )
 
@@ -790,17 +877,15 @@ class BaseSeries(BaseNumerical):
         :rtype:    :py:class:`~.BaseSeries` or derived class
 
         """
-        x = self.x
-        y = self.y
+        # x is sorted, so the points to keep are a contiguous slice and we can
+        # find its boundaries with a binary search instead of going through
+        # the entire array with masks
+        start, stop = 0, len(self)
         if init is not None:
-            m = x >= init
-            x = x[m]
-            y = y[m]
+            start = np.searchsorted(self.x, init, side="left")
         if end is not None:
-            m = x <= end
-            x = x[m]
-            y = y[m]
-        return type(self)(x, y, True)
+            stop = np.searchsorted(self.x, end, side="right")
+        return type(self)(self.x[start:stop], self.y[start:stop], True)
 
     def crop(self, init=None, end=None):
         """Remove data outside the the interval ``[init, end]``. If
@@ -844,7 +929,9 @@ class BaseSeries(BaseNumerical):
         return reduction(self.y)
 
 
-def sample_common(series, resample=False, piecewise_constant=False):
+def sample_common(
+    series, resample=False, piecewise_constant=False, piecewise_linear=False
+):
     """Take a list of series and return new ones so that they are all defined on the
     same points.
 
@@ -856,7 +943,9 @@ def sample_common(series, resample=False, piecewise_constant=False):
     series. Additionally, if ``piecewise_constant=True``, the approximant used
     for resampling is a piecewise constant function, splines are not used,
     instead, the nearest neighbors are used. Use this when you have series with
-    discontinuities.
+    discontinuities. If ``piecewise_linear=True``, the series are linearly
+    interpolated, which is much faster than using splines when there are many
+    (or long) series, at the cost of some accuracy.
 
     :param series: The series to resample or redefine on the common points
     :type series:  list of :py:class:`~.Series`
@@ -868,6 +957,9 @@ def sample_common(series, resample=False, piecewise_constant=False):
                                If ``piecewise_constant=True``, the approximant used
                                for resampling is a piecewise constant function.
     :type piecewise_constant: bool
+    :param piecewise_linear: Whether to use linear interpolation instead of
+                             splines.
+    :type piecewise_linear: bool
     :returns:  Resampled series so that they are all defined in
                the same interval.
     :rtype:    list of :py:class:`~.Series`
@@ -892,15 +984,19 @@ def sample_common(series, resample=False, piecewise_constant=False):
             return [ss.copy() for ss in series]
 
     if resample:
-        # Find the series with max xmin
-        s_xmin = max(series, key=lambda x: x.xmin)
-        # Find the series with min xmax
-        s_xmax = min(series, key=lambda x: x.xmax)
-        # Find the series with min number of points
-        s_ns = min(series, key=len)
-        x = np.linspace(s_xmin.xmin, s_xmax.xmax, len(s_ns))
+        # We collect the boundaries and the lengths of all the series in one
+        # sweep, then we find the common interval with NumPy reductions: max
+        # xmin, min xmax, and min number of points
+        xmins, xmaxs, lengths = np.array(
+            [(s.xmin, s.xmax, len(s)) for s in series], dtype=float
+        ).T
+        x = np.linspace(xmins.max(), xmaxs.min(), int(lengths.min()))
         return [
-            s.resampled(x, piecewise_constant=piecewise_constant)
+            s.resampled(
+                x,
+                piecewise_constant=piecewise_constant,
+                piecewise_linear=piecewise_linear,
+            )
             for s in series
         ]
 
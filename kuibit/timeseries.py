@@ -42,13 +42,93 @@ The additional functions provided in :py:mod:`~.timeseries` are:
 
 """
 
+import cmath
+import math
 import warnings
+from functools import lru_cache
 
 import numpy as np
+from scipy import fft as scipy_fft
 from scipy import signal
 
 from kuibit import frequencyseries
-from kuibit.series import BaseSeries
+
+# numba is optional, njit is None when it is not available. See series.py.
+from kuibit.series import BaseSeries, _use_numba, njit
+
+
+def _not_duplicated_mask_numpy(t):
+    """Return the mask of the elements of t that are not overwritten by a later
+    segment. See comments in :py:func:`~.remove_duplicated_iters`.
+
+    """
+    # We write the outputs of the ufuncs directly into preallocated arrays to
+    # avoid temporary copies. Reversed views of an array are writable, so we
+    # can accumulate t[::-1] into t2[::-1] and obtain t2 already in the right
+    # order.
+    t2 = np.empty_like(t)
+    np.minimum.accumulate(t[::-1], out=t2[::-1])
+    mask = np.empty(len(t), dtype=bool)
+    if len(t) == 0:
+        return mask
+    np.less(t[:-1], t2[1:], out=mask[:-1])
+    # The last point is always included
+    mask[-1] = True
+    return mask
+
+
+def _not_duplicated_mask_loop(t):
+    """Return the mask of the elements of t that are not overwritten by a later
+    segment.
+
+    This is the same as :py:func:`~._not_duplicated_mask_numpy`, but it walks
+    the array only once (backwards), without creating temporary arrays. It is
+    meant to be compiled with numba.
+
+    """
+    num_points = len(t)
+    mask = np.empty(num_points, dtype=np.bool_)
+    if num_points == 0:
+        return mask
+    # The last point is always included
+    mask[num_points - 1] = True
+    # running_min is the minimum of t[index + 1:]. As np.minimum.accumulate,
+    # we propagate NaNs: once we find a NaN, running_min stays NaN and all the
+    # previous points are masked out (t[index] != t[index] only for NaNs).
+    running_min = t[num_points - 1]
+    for index in range(num_points - 2, -1, -1):
+        mask[index] = t[index] < running_min
+        if mask[index] or t[index] != t[index]:
+            running_min = t[index]
+    return mask
+
+
+if njit is not None:
+    _not_duplicated_mask_numba = njit(cache=True)(_not_duplicated_mask_loop)
+
+
+@lru_cache(maxsize=4)
+def _window_array(num_points, window_function, *args):
+    """Return ``window_function(num_points, *args)``, caching the result.
+
+    The coefficients of a window depend only on the number of points and on the
+    parameters, so there is no reason to recompute them every time the same
+    window is applied to series with the same length.
+
+    The first argument is the number of points, so this function can be passed
+    directly to :py:meth:`~.TimeSeries.windowed`.
+
+    The returned array is shared among all the calls with the same arguments,
+    so it is read-only. Since each array is as long as the series, we keep only
+    the few most recently used ones.
+
+    All the arguments have to be hashable, so parameters that could be passed
+    as NumPy scalars or 0-d arrays should be converted to Python scalars first.
+
+    """
+    window = np.array(window_function(num_points, *args))
+    window.flags.writeable = False
+    return window
 
 
 def remove_duplicated_iters(t, y):
@@ -102,11 +182,77 @@ def remove_duplicated_iters(t, y):
     t = np.array(t)
     y = np.array(y)
 
-    t2 = np.minimum.accumulate(t[::-1])[::-1]
-    # Here we append [True] because the last point is always included
-    msk = np.hstack((t[:-1] < t2[1:], [True]))
+    # For large arrays, numba (if available) computes the same mask walking the
+    # array only once, without the temporary arrays
+    if _use_numba(t):
+        msk = _not_duplicated_mask_numba(t)
+    else:
+        msk = _not_duplicated_mask_numpy(t)
+
+    # The times are strictly increasing by construction
+    return TimeSeries(t[msk], y[msk], True)
+
+
+def _unfold_phase_numpy(phase):
+    """Remove phase jumps to get a continuous (unfolded) phase.
+
+    See :py:func:`~.unfold_phase`.
+
+    """
+    # All the operations are performed in place on the output array, so that we
+    # do not allocate any temporary array.
+
+    # wind is the winding number, how many time we have went over 2 * np.pi.
+    # We keep the precision of the input (at least single precision).
+    wind = np.empty_like(phase, dtype=np.result_type(phase.dtype, np.float32))
+    if len(phase) == 0:
+        return wind
+    # wind[0] = 0. Then, we find the jumps, when the phase goes from 2 pi to 0
+    # (or anything with the same offset). Once we divide by 2 pi, a jump is
+    # when the phase goes from 1 to 0. np.rint allows us to identify the offest
+    # of 2 pi: when the difference between phase[:-1] - phase[1:] is greater
+    # than 2 pi, this will be rounded up to 1, when it is smaller, it is
+    # rounded down to 0. For example, if phase[i] = np.pi + eps and phase[i+1]
+    # = -np.pi, then, this is a jump and np.rint rounds to 1.
+    wind[0] = 0
+    np.subtract(phase[:-1], phase[1:], out=wind[1:])
+    wind *= 1 / (2 * np.pi)
+    np.rint(wind, out=wind)
+    # Finally, we collect how many jumps have occurred. This is the winding
+    # number and tell us how many 2 pi we have to add.
+    np.cumsum(wind, out=wind)
+    wind *= 2 * np.pi
+    wind += phase
+    return wind
+
 
-    return TimeSeries(t[msk], y[msk])
+def _unfold_phase_loop(phase, out):
+    """Remove phase jumps to get a continuous (unfolded) phase, writing the
+    result in the array ``out``.
+
+    This is the same as :py:func:`~._unfold_phase_numpy`, but the winding
+    number is accumulated in a scalar while walking the array only once. Since
+    we also keep the previous (folded) phase in a scalar, ``out`` can be
+    ``phase`` itself. It is meant to be compiled with numba.
+
+    """
+    num_points = len(phase)
+    if num_points == 0:
+        return out
+    previous = phase[0]
+    out[0] = previous
+    # wind is the winding number, how many time we have went over 2 * np.pi
+    wind = 0.0
+    for index in range(1, num_points):
+        current = phase[index]
+        wind += np.rint((previous - current) * (1 / (2 * np.pi)))
+        out[index] = current + (2 * np.pi) * wind
+        previous = current
+    return out
+
+
+if njit is not None:
+    _unfold_phase_numba = njit(cache=True)(_unfold_phase_loop)
 
 
 def unfold_phase(phase):
@@ -123,22 +269,18 @@ def unfold_phase(phase):
     #  This is trivially done by adding an argument jump with default
     #       value of 2 pi.
 
-    # num_phase is how many time we reach 2 pi
-    num_phase = phase / (2 * np.pi)
-    # wind is the winding number, how many time we have went over 2 * np.pi
-    wind = np.zeros_like(phase)
-    # wind[0] = 0. Then, we find the jumps, when the phase goes from 2 pi to 0
-    # (or anything with the same offset). Since we divided by 2 pi, a jump is
-    # when nph goes from 1 to 0. np.rint allows us to identify the offest of 2
-    # pi: when the difference between phase[:-1] - phase[1:] is greater than 2
-    # pi, this will be rounded up to 1, when it is smaller, it is rounded down
-    # to 0. For example, if phase[i] = np.pi + eps and phase[i+1] = -np.pi,
-    # then, this is a jump and np.rint rounds to 1.
-    wind[1:] = np.rint(num_phase[:-1] - num_phase[1:])
-    # Finally, we collect how many jumps have occurred. This is the winding
-    # number and tell us how many 2 pi we have to add.
-    wind = np.cumsum(wind)
-    return phase + (2 * np.pi) * wind
+    phase = np.asarray(phase)
+
+    # For large arrays, numba (if available) does the same in a single pass.
+    # Dtypes that numba does not support (e.g., big-endian floats) go through
+    # the NumPy implementation.
+    if _use_numba(phase):
+        # Same output dtype as _unfold_phase_numpy
+        out = np.empty_like(
+            phase, dtype=np.result_type(phase.dtype, np.float32)
+        )
+        return _unfold_phase_numba(phase, out)
+    return _unfold_phase_numpy(phase)
 
 
 def combine_ts(series, prefer_late=True):
@@ -160,20 +302,24 @@ def combine_ts(series, prefer_late=True):
 
     """
 
-    # Late and early can be implemented in one shot by implementing one and
-    # sending t -> -t for the other. For the "straight" way we implement
-    # combine_ts_early.
+    # All the time arrays are sorted, so each series can only contribute a
+    # contiguous slice to the output: the times before (for prefer_late) or
+    # after (for prefer_early) what we have already collected. We never need to
+    # merge elements, we only need to find where to cut each series, and this
+    # can be done with a binary search (np.searchsorted). With k series and N
+    # points in total, the cost is O(k log k) for sorting the series, O(k log
+    # N) for the searches, and O(N) for the final concatenation (which is
+    # better than a k-way merge with a heap, O(N log k)).
     #
-    # Let's consider a simple example for the reversed case
+    # Let's consider a simple example for the prefer_late case
     # t1 = [1, 2, 3], t2 = [2, 3, 4], we want to have t = [1, 2, 3, 4]
-    # sign = -1
-    # timeseries = [t2, t1]
-    # times = t2[::-1] = [4, 3, 2]
-    # Next we walk through the remaining elements of the list
-    # We want only to keep those with t < times[-1] = 2 (hence the switch)
-    # In this case msk = [3, 2, 1] < 2 = [False, False, True], so
-    # s_t[msk] = [1] and times = [4, 3, 2, 1].
-    # At the end, we need to reverse the order again
+    # timeseries = [t2, t1] (sorted by decreasing tmin)
+    # We start with t2 and first_time = 2.
+    # Next we walk through the remaining elements of the list.
+    # We want only to keep those with t < first_time = 2, so we search where 2
+    # would be inserted in t1 (index 1) and keep t1[:1] = [1].
+    # At the end, we need to reverse the order of the chunks, since we
+    # collected them from the latest to the earliest.
 
     # sign is responsible of inverting the sorting key
     sign = -1 if prefer_late else 1
@@ -182,19 +328,32 @@ def combine_ts(series, prefer_late=True):
     # they are the same then the second items are compared, and so on.
     # So here we sort by tmin and tmax
     timeseries = sorted(series, key=lambda x: (sign * x.tmin, sign * x.tmax))
-    # Now we are going to build up the t and y array, starting with the first
-    times = timeseries[0].t[::sign]
-    values = timeseries[0].y[::sign]
+    # Now we are going to build up the t and y array, starting with the first.
+    # Growing the arrays with np.append would copy everything we have collected
+    # so far at each iteration, so we collect the pieces in lists and
+    # concatenate them only once at the end.
+    times_chunks = [timeseries[0].t]
+    values_chunks = [timeseries[0].y]
+    # First (prefer_late) or last (prefer_early) time that we have collected
+    boundary_time = timeseries[0].tmin if prefer_late else timeseries[0].tmax
     for s in timeseries[1:]:
-        # We need to walk backwards for "prefer_late"
-        s_t = s.t[::sign]
-        s_y = s.y[::sign]
         # We only keep those times that we don't have yet in the array times
-        msk = s_t < times[-1] if prefer_late else s_t > times[-1]
-        times = np.append(times, s_t[msk])
-        values = np.append(values, s_y[msk])
+        if prefer_late:
+            index = np.searchsorted(s.t, boundary_time, side="left")
+            new_times, new_values = s.t[:index], s.y[:index]
+        else:
+            index = np.searchsorted(s.t, boundary_time, side="right")
+            new_times, new_values = s.t[index:], s.y[index:]
+        if len(new_times) > 0:
+            times_chunks.append(new_times)
+            values_chunks.append(new_values)
+            boundary_time = new_times[0] if prefer_late else new_times[-1]
+
+    times = np.concatenate(times_chunks[::sign])
+    values = np.concatenate(values_chunks[::sign])
 
-    return TimeSeries(times[::sign], values[::sign])
+    # The times are monotonic by construction
+    return TimeSeries(times, values, True)
 
 
 class TimeSeries(BaseSeries):
@@ -392,12 +551,14 @@ class TimeSeries(BaseSeries):
         :returns:  Time series resampled with given frequency.
         :rtype:   :py:class:`~.TimeSeries`
         """
-        dt = 1.0 / float(frequency)
+        dt = 1.0 / frequency
         if dt > self.time_length:
             raise ValueError("Frequency too short for resampling")
         n = int(np.floor(self.time_length / dt))
-        # We have to add one to n, so that we can include the tmax point
-        new_times = self.tmin + np.arange(0, n + 1) * dt
+        # We have to add one to n, so that we can include the tmax point.
+        # np.linspace fills the array directly, without the intermediate
+        # arrays of np.arange(0, n + 1) * dt + tmin
+        new_times = np.linspace(self.tmin, self.tmin + n * dt, n + 1)
 
         return self.resampled(new_times)
 
@@ -463,15 +624,21 @@ class TimeSeries(BaseSeries):
                 "Zero-padding cannot decrease the number of points"
             )
 
-        new_zeros_t = np.linspace(
-            self.tmax + self.dt,
-            self.tmax + N_new_zeros * self.dt,
-            N_new_zeros,
-        )
-        return TimeSeries(
-            np.append(self.t, new_zeros_t),
-            np.append(self.y, np.zeros(N_new_zeros)),
-        )
+        dt = self.dt
+        num_points = len(self)
+
+        # We allocate the output arrays only once and fill them
+        new_t = np.empty(N, dtype=np.result_type(self.t.dtype, float))
+        new_t[:num_points] = self.t
+        new_zeros_t = new_t[num_points:]
+        new_zeros_t[:] = np.arange(1, N_new_zeros + 1)
+        new_zeros_t *= dt
+        new_zeros_t += self.tmax
+
+        new_y = np.zeros(N, dtype=np.result_type(self.y.dtype, float))
+        new_y[:num_points] = self.y
+
+        return TimeSeries(new_t, new_y, True)
 
     def zero_pad(self, N):
         """Pad the timeseries with zeros so that it has a total of N points.
@@ -496,7 +663,9 @@ class TimeSeries(BaseSeries):
         :returns: A new :py:class:`~.TimeSeries` with zero mean.
         :rtype: :py:class:`~.TimeSeries`
         """
-        return TimeSeries(self.t, self.y - self.y.mean())
+        # y.sum() / len(self) is the same as y.mean(), but it skips the
+        # Python-level wrapper of mean, which dominates for short series
+        return TimeSeries(self.t, self.y - self.y.sum() / len(self), True)
 
     def mean_remove(self):
         """Remove the mean value from the data."""
@@ -569,7 +738,7 @@ class TimeSeries(BaseSeries):
         :returns: A new :py:class:`~.TimeSeries` with time shifted.
         :rtype: :py:class:`~.TimeSeries`
         """
-        return TimeSeries(self.t + tshift, self.y)
+        return TimeSeries(self.t + tshift, self.y, True)
 
     def time_shift(self, tshift):
         """Shift the timeseries by ``tshift`` so that what was t = 0 will be ``tshift``.
@@ -590,7 +759,24 @@ class TimeSeries(BaseSeries):
         :rtype: :py:class:`~.TimeSeries`
 
         """
-        return TimeSeries(self.t, self.y * np.exp(1j * pshift))
+        # pshift can be an array with the same length as the series (a time
+        # dependent phase). When it is a scalar, we use the functions from math
+        # and cmath, which are much faster than NumPy's on scalars.
+        if np.ndim(pshift) != 0:
+            return TimeSeries(self.t, self.y * np.exp(1j * pshift), True)
+
+        if np.iscomplexobj(self.y):
+            return TimeSeries(self.t, self.y * cmath.exp(1j * pshift), True)
+
+        # When the signal is real, we can avoid the complex multiplication and
+        # directly write the real and imaginary parts of the output. The output
+        # keeps the precision of the input (e.g., float32 becomes complex64).
+        new_y = np.empty(
+            len(self), dtype=np.result_type(self.y.dtype, np.complex64)
+        )
+        np.multiply(self.y, math.cos(pshift), out=new_y.real)
+        np.multiply(self.y, math.sin(pshift), out=new_y.imag)
+        return TimeSeries(self.t, new_y, True)
 
     def phase_shift(self, pshift):
         """Shift the complex phase timeseries by ``pshift``. If the signal is real,
@@ -631,7 +817,9 @@ class TimeSeries(BaseSeries):
 
         """
         factor = unit if inverse else 1 / unit
-        return TimeSeries(self.t * factor, self.y)
+        # A positive factor preserves the ordering of the times, so we have to
+        # check them only when the factor is not positive
+        return TimeSeries(self.t * factor, self.y, factor > 0)
 
     def time_unit_change(self, unit, inverse=False):
         """Rescale time units by unit.
@@ -694,7 +882,17 @@ class TimeSeries(BaseSeries):
         :rtype:     :py:class:`~.TimeSeries`
 
         """
-        ret = TimeSeries(self.t, unfold_phase(np.angle(self.y)))
+        phase = np.angle(self.y)
+        # For large series, numba (if available) unfolds the phase in place,
+        # in a single pass, so that the only array we allocate is the one
+        # returned by np.angle. np.angle is already vectorized, computing the
+        # angle inside the numba loop would be slower. Both paths keep the dtype
+        # of phase (e.g., float32 for complex64 data).
+        if _use_numba(phase):
+            _unfold_phase_numba(phase, phase)
+        else:
+            phase = _unfold_phase_numpy(phase)
+        ret = TimeSeries(self.t, phase, True)
         if t_of_zero_phase is not None:
             ret -= ret(t_of_zero_phase)
         return ret
@@ -771,7 +969,7 @@ class TimeSeries(BaseSeries):
 
         if callable(window_function):
             window_array = window_function(len(self), *args, **kwargs)
-            return TimeSeries(self.t, self.y * window_array)
+            return TimeSeries(self.t, self.y * window_array, True)
 
         if isinstance(window_function, str):
             window_function_method = f"{window_function}_windowed"
@@ -809,7 +1007,7 @@ class TimeSeries(BaseSeries):
         :rtype:    :py:class:`~.TimeSeries`
 
         """
-        return self.windowed(signal.tukey, alpha)
+        return self.windowed(_window_array, signal.tukey, float(alpha))
 
     def tukey_window(self, alpha):
         """Apply Tukey window with parameter ``alpha``.
@@ -818,7 +1016,7 @@ class TimeSeries(BaseSeries):
         :type alpha: float
 
         """
-        self.window(signal.tukey, alpha)
+        self.window(_window_array, signal.tukey, float(alpha))
 
     def hamming_windowed(self):
         """Return a timeseries with Hamming window applied.
@@ -827,19 +1025,19 @@ class TimeSeries(BaseSeries):
         :rtype:    :py:class:`~.TimeSeries`
 
         """
-        return self.windowed(signal.hamming)
+        return self.windowed(_window_array, signal.hamming)
 
     def hamming_window(self):
         """Apply Hamming window."""
-        self.window(signal.hamming)
+        self.window(_window_array, signal.hamming)
 
     def blackman_windowed(self):
         """Return a timeseries with Blackman window applied."""
-        return self.windowed(signal.blackman)
+        return self.windowed(_window_array, signal.blackman)
 
     def blackman_window(self):
         """Apply Blackman window."""
-        self.window(signal.blackman)
+        self.window(_window_array, signal.blackman)
 
     def savgol_smoothed_time(self, tsmooth, order=3):
         """Return a resampled timeseries with uniform timesteps, smoothed with
@@ -863,12 +1061,13 @@ class TimeSeries(BaseSeries):
             ts = self.regular_resampled()
         else:
             ts = self
+        # ts is regularly sampled, so we can take the first timestep
         dt = ts.t[1] - ts.t[0]
         # The savgol method requires a odd window
         # If it is not, we add one point
         window = int(np.rint(tsmooth / dt))
         window = window + 1 if (window % 2 == 0) else window
-        return self.savgol_smoothed(window, order)
+        return ts.savgol_smoothed(window, order)
 
     def savgol_smooth_time(self, tsmooth, order=3):
         """Resample the timeseries with uniform timesteps, smooth it with
@@ -912,19 +1111,49 @@ class TimeSeries(BaseSeries):
 
         dt = regular_ts.dt
 
-        if self.is_complex():
-            frequencies = np.fft.fftfreq(len(regular_ts), d=dt)
-            fft = np.fft.fft(regular_ts.y)
-
-            f = np.fft.fftshift(frequencies)
-            fft = np.fft.fftshift(fft)
-        else:
-            # Note the "r"
-            f = np.fft.rfftfreq(len(regular_ts), d=dt)
-            fft = np.fft.rfft(regular_ts.y)
-
         # We need the normalization dt to compute physical quantities.
         # Intuitively, NumPy computes A_k = \sum a_k exp(-2 pi f t), to
         # transform this into an integral (true Fourier transform), we have to
         # multiply this by the measure of integration.
-        return frequencyseries.FrequencySeries(f, fft * dt)
+
+        # We use SciPy's FFTs instead of NumPy's because they are generally
+        # faster (and they preserve single precision). We check the dtype with
+        # np.iscomplexobj because is_complex() is False for complex64.
+        if np.iscomplexobj(regular_ts.y):
+            num_points = len(regular_ts)
+            fft = scipy_fft.fft(regular_ts.y)
+
+            # We want the frequencies sorted from the most negative to the most
+            # positive, i.e., fftshift(fftfreq(num_points, dt)). These are
+            # simply (k - num_points // 2) / (num_points * dt) for k from 0 to
+            # num_points - 1, so we compute them directly.
+            f = np.arange(num_points) - num_points // 2
+            f = f * (1 / (num_points * dt))
+
+            # fftshift moves the last num_points // 2 elements (the negative
+            # frequencies) in front of the other ones. We perform this
+            # rotation while we normalize the result, so that we go through
+            # the data only once.
+            num_negative = num_points // 2
+            shifted_fft = np.empty_like(fft)
+            np.multiply(
+                fft[num_points - num_negative :],
+                dt,
+                out=shifted_fft[:num_negative],
+            )
+            np.multiply(
+                fft[: num_points - num_negative],
+                dt,
+                out=shifted_fft[num_negative:],
+            )
+            fft = shifted_fft
+        else:
+            # Note the "r": for real signals we use the real FFT, which
+            # computes only the positive frequencies (the negative ones are
+            # the complex conjugates) and does half of the work
+            f = scipy_fft.rfftfreq(len(regular_ts), d=dt)
+            fft = scipy_fft.rfft(regular_ts.y)
+            fft *= dt
+
+        # The frequencies are monotonic by construction
+        return frequencyseries.FrequencySeries(f, fft, True)
@@ -79,6 +79,41 @@ class TestTimeseries(unittest.TestCase):
             np.array([1, 2]),
         )
 
+        # Test the loop used with numba
+        self.assertTrue(series._is_strictly_increasing_loop(self.times))
+        self.assertFalse(series._is_strictly_increasing_loop([0, 1, 1]))
+
+    @unittest.skipIf(series.njit is None, "numba is not available")
+    def test___return_array_if_monotonic_numba(self):
+
+        with mock.patch.object(series, "_NUMBA_MIN_SIZE", 0):
+            times = np.linspace(2 * np.pi, 0, 100)
+            with self.assertRaises(ValueError):
+                self.TS._return_array_if_monotonic(times)
+
+            times = np.array([0, 1, 2, 2, 3])
+            with self.assertRaises(ValueError):
+                self.TS._return_array_if_monotonic(times)
+
+            self.assertCountEqual(
+                self.TS._return_array_if_monotonic(self.times), self.times
+            )
+
+            # Dtypes that numba does not support go through NumPy
+            for dtype in (">f8", np.float16):
+                times = np.linspace(0, 1, 100).astype(dtype)
+                self.assertFalse(series._use_numba(times))
+                self.assertCountEqual(
+                    self.TS._return_array_if_monotonic(times), times
+                )
+
+        # Big-endian array above the threshold
+        times = np.arange(series._NUMBA_MIN_SIZE + 1).astype(">f8")
+        wrong_times = times[::-1].copy()
+        ts.TimeSeries(times, times)
+        with self.assertRaises(ValueError):
+            ts.TimeSeries(wrong_times, times)
+
     def test_init(self):
         # Check that errors are thrown if:
         # 1. There is a mismatch between t and y
@@ -173,6 +208,16 @@ class TestTimeseries(unittest.TestCase):
         ts_log = ts.TimeSeries(times, self.values)
         self.assertFalse(ts_log.is_regularly_sampled())
 
+        # Test that the result follows the changes in t
+        regular = self.TS.copy()
+        self.assertTrue(regular.is_regularly_sampled())
+        regular.t = times
+        self.assertFalse(regular.is_regularly_sampled())
+        regular.resample(np.linspace(1, 10, 100))
+        self.assertTrue(regular.is_regularly_sampled())
+        regular.t[1] *= 1.01
+        self.assertFalse(regular.is_regularly_sampled())
+
         # If the series is only one point long, an error should be raised
         with self.assertRaises(RuntimeError):
             ts.TimeSeries([1], [1]).is_regularly_sampled()
@@ -530,6 +575,43 @@ class TestTimeseries(unittest.TestCase):
 
         self.assertTrue(np.allclose(sins.y, 1j * self.values))
 
+        # Complex
+        self.assertTrue(
+            np.allclose(
+                self.TS_c.phase_shifted(np.pi / 2).y,
+                1j * self.values - self.values,
+            )
+        )
+
+        # Time-dependent phase
+        pshift = np.linspace(0, 1, len(self.times))
+        self.assertTrue(
+            np.allclose(
+                sins.phase_shifted(pshift).y,
+                1j * self.values * np.exp(1j * pshift),
+            )
+        )
+        self.assertTrue(
+            np.allclose(
+                ts.TimeSeries(self.times, self.values).phase_shifted(pshift).y,
+                self.values * np.exp(1j * pshift),
+            )
+        )
+
+        # Single precision is preserved
+        for dtype, expected_dtype in (
+            (np.float32, np.complex64),
+            (np.complex64, np.complex64),
+            (np.float64, np.complex128),
+        ):
+            shifted = ts.TimeSeries(
+                self.times, self.values.astype(dtype)
+            ).phase_shifted(np.pi / 2)
+            self.assertEqual(shifted.y.dtype, expected_dtype)
+            self.assertTrue(
+                np.allclose(shifted.y, 1j * self.values, atol=1e-6)
+            )
+
     def test_crop(self):
 
         sins = ts.TimeSeries(self.times, self.values)
@@ -720,6 +802,27 @@ class TestTimeseries(unittest.TestCase):
         res.resample([1, 1.1, 1.9, 2], piecewise_constant=True)
         self.assertTrue(np.allclose(res.y, np.array([10, 10, 0, 0])))
 
+        # Test resample with piecewise_linear
+        res = ts.TimeSeries([1, 2], [10, 0])
+        res.resample([1, 1.1, 1.9, 2], piecewise_linear=True)
+        self.assertTrue(np.allclose(res.y, np.array([10, 9, 1, 0])))
+
+        res_c = ts.TimeSeries([1, 2], [10 + 10j, 0])
+        res_c.resample([1, 1.1, 1.9, 2], piecewise_linear=True)
+        self.assertTrue(
+            np.allclose(res_c.y, np.array([10 + 10j, 9 + 9j, 1 + 1j, 0]))
+        )
+
+        # Outside the interval
+        with self.assertRaises(ValueError):
+            res.resampled([0, 1], piecewise_linear=True)
+
+        # Incompatible options
+        with self.assertRaises(ValueError):
+            res.resampled(
+                [1, 2], piecewise_constant=True, piecewise_linear=True
+            )
+
     def test_integrate(self):
 
         times_long = np.linspace(0, 2 * np.pi, 10000)
@@ -813,6 +916,54 @@ class TestTimeseries(unittest.TestCase):
             ts.TimeSeries([1, 2, 3], [0, 0, 0]),
         )
 
+        # Test the loop used with numba against the NumPy version
+        t = np.array([1, 2, 3, 4, 2, 3, 5, 6, 1, 2, 7, 7])
+        self.assertTrue(
+            np.array_equal(
+                ts._not_duplicated_mask_loop(t),
+                ts._not_duplicated_mask_numpy(t),
+            )
+        )
+
+        # With NaNs
+        for t in (
+            np.array([1, 2, np.nan, 3, 2, 4]),
+            np.array([1, 2, 3, 2, 4, np.nan]),
+        ):
+            self.assertTrue(
+                np.array_equal(
+                    ts._not_duplicated_mask_loop(t),
+                    ts._not_duplicated_mask_numpy(t),
+                )
+            )
+
+    @unittest.skipIf(series.njit is None, "numba is not available")
+    def test_remove_duplicated_iters_numba(self):
+
+        t = np.array([1, 2, 3, 4, 2, 3])
+        y = np.array([0, 0, 0, 0, 0, 0])
+
+        with mock.patch.object(series, "_NUMBA_MIN_SIZE", 0):
+            self.assertEqual(
+                ts.remove_duplicated_iters(t, y),
+                ts.TimeSeries([1, 2, 3], [0, 0, 0]),
+            )
+
+            # Big-endian data (as read from HDF5 files) is not supported by
+            # numba and goes through NumPy
+            self.assertEqual(
+                ts.remove_duplicated_iters(t.astype(">f8"), y),
+                ts.TimeSeries([1, 2, 3], [0, 0, 0]),
+            )
+
+        # Above the real threshold
+        t = np.append(np.arange(series._NUMBA_MIN_SIZE), [1, 2])
+        t = t.astype(">f8")
+        self.assertEqual(
+            ts.remove_duplicated_iters(t, np.zeros_like(t)),
+            ts.TimeSeries([0, 1, 2], [0, 0, 0]),
+        )
+
     def test_time_unit_change(self):
 
         sins = ts.TimeSeries(self.times, self.values)
@@ -836,6 +987,10 @@ class TestTimeseries(unittest.TestCase):
 
         self.assertTrue(np.allclose(sins.t, new_times_inverse))
 
+        # Negative units invert the direction of time
+        with self.assertRaises(ValueError):
+            sins.time_unit_changed(-1)
+
         two_times = np.linspace(0, 4 * np.pi, 100)
 
         sins = self.TS.copy()
@@ -891,6 +1046,48 @@ class TestTimeseries(unittest.TestCase):
             np.allclose(ts.combine_ts([ts4, ts5], prefer_late=True).y, coss5)
         )
 
+        # Many overlapping segments (e.g., checkpoints), each overlapping with
+        # the second half of the previous one. The values are the index of
+        # the segment, so that we know where the data comes from.
+        num_segments = 50
+        segments = [
+            ts.TimeSeries(
+                50 * index + np.arange(100), np.full(100, index, dtype=float)
+            )
+            for index in range(num_segments)
+        ]
+        # The order of the input should not matter
+        shuffled = segments[1::2] + segments[::2]
+
+        # With prefer_late, we take the first half of every segment, and the
+        # full last one
+        combined_late = ts.combine_ts(shuffled)
+        self.assertTrue(
+            np.array_equal(combined_late.t, np.arange(50 * num_segments + 50))
+        )
+        self.assertTrue(
+            np.array_equal(
+                combined_late.y,
+                np.append(
+                    np.repeat(np.arange(num_segments - 1), 50),
+                    np.full(100, num_segments - 1),
+                ),
+            )
+        )
+
+        # With prefer_early, we take the full first segment, and the second
+        # half of all the other ones
+        combined_early = ts.combine_ts(shuffled, prefer_late=False)
+        self.assertTrue(np.array_equal(combined_early.t, combined_late.t))
+        self.assertTrue(
+            np.array_equal(
+                combined_early.y,
+                np.append(
+                    np.zeros(100), np.repeat(np.arange(1, num_segments), 50)
+                ),
+            )
+        )
+
     def test_resample_common(self):
 
         # Test with resample=False
@@ -934,6 +1131,14 @@ class TestTimeseries(unittest.TestCase):
         # The accuracy is not as great
         self.assertTrue(np.allclose(new_ts1_c.y, sins3, atol=1e-3))
 
+        # Test with piecewise_linear = True
+        new_ts1_l, new_ts2_l = series.sample_common(
+            [ts1, ts2], piecewise_linear=True, resample=True
+        )
+
+        self.assertTrue(np.allclose(new_ts1_l.y, sins3, atol=1e-6))
+        self.assertTrue(np.allclose(new_ts2_l.y, sins3, atol=1e-6))
+
         # Test a case in which there's no resampling
         newer_ts1, newer_ts2 = series.sample_common(
             [new_ts1, new_ts2], resample=True
@@ -989,6 +1194,22 @@ class TestTimeseries(unittest.TestCase):
         new_ones.window("blackman")
         self.assertTrue(np.allclose(new_ones.y, black_array))
 
+        # Test that windows are cached and cannot be modified
+        self.assertIs(
+            ts._window_array(100, signal.tukey, 0.5),
+            ts._window_array(100, signal.tukey, 0.5),
+        )
+        with self.assertRaises(ValueError):
+            ts._window_array(100, signal.tukey, 0.5)[0] = 1
+
+        # Test that the parameter does not have to be hashable
+        self.assertTrue(
+            np.allclose(ones.tukey_windowed(np.array(0.5)).y, tuk_array)
+        )
+        new_ones = ones.copy()
+        new_ones.tukey_window(np.float64(0.5))
+        self.assertTrue(np.allclose(new_ones.y, tuk_array))
+
     def test_savgol_smooth(self):
 
         # Here I just test that I am correctly calling the filter
@@ -1019,11 +1240,25 @@ class TestTimeseries(unittest.TestCase):
             )
         )
 
+        # Test complex with different real and imaginary parts
+        expected_y_cos = signal.savgol_filter(np.cos(self.times), 11, 3)
+        TS_c2 = ts.TimeSeries(
+            self.times, np.cos(self.times) + 1j * self.values
+        )
+        self.assertTrue(
+            np.allclose(
+                TS_c2.savgol_smoothed(11, 3).y,
+                expected_y_cos + 1j * expected_y,
+            )
+        )
+
         # Test non regularly sampled
         with self.assertWarns(RuntimeWarning):
             tts = self.TS.copy()
             tts.t[1] *= 1.01
-            tts.savgol_smoothed_time(0.63, 3)
+            smoothed = tts.savgol_smoothed_time(0.63, 3)
+        # The output is resampled
+        self.assertTrue(smoothed.is_regularly_sampled())
 
         sins = self.TS.copy()
         sins.savgol_smooth(11, 3)
@@ -1047,6 +1282,20 @@ class TestTimeseries(unittest.TestCase):
         )
         self.assertTrue(np.allclose(ts.unfold_phase(y), yexp))
 
+        # Single precision is preserved
+        unfolded_single = ts.unfold_phase(y.astype(np.float32))
+        self.assertEqual(unfolded_single.dtype, np.float32)
+        self.assertTrue(np.allclose(unfolded_single, yexp))
+
+        # Test the loop used with numba against the NumPy version
+        self.assertTrue(
+            np.allclose(ts._unfold_phase_loop(y, np.empty(len(y))), yexp)
+        )
+        # In place
+        y_copy = y.copy()
+        ts._unfold_phase_loop(y_copy, y_copy)
+        self.assertTrue(np.allclose(y_copy, yexp))
+
         exp = ts.TimeSeries(self.times, np.exp(1j * self.times))
 
         self.assertTrue(np.allclose(exp.unfolded_phase().y, self.times))
@@ -1081,6 +1330,55 @@ class TestTimeseries(unittest.TestCase):
             )
         )
 
+    @unittest.skipIf(series.njit is None, "numba is not available")
+    def test_unfold_phase_numba(self):
+
+        y = np.append(
+            np.linspace(0, 2 * np.pi, 100), np.linspace(0, 2 * np.pi, 100)
+        )
+
+        yexp = np.append(
+            np.linspace(0, 2 * np.pi, 100),
+            np.linspace(0, 2 * np.pi, 100) + 2 * np.pi,
+        )
+
+        with mock.patch.object(series, "_NUMBA_MIN_SIZE", 0):
+            self.assertTrue(np.allclose(ts.unfold_phase(y), yexp))
+
+            # The output dtype is the same as with NumPy
+            for dtype in (np.float32, np.float64, np.int64):
+                self.assertEqual(
+                    ts.unfold_phase(y.astype(dtype)).dtype,
+                    ts._unfold_phase_numpy(y.astype(dtype)).dtype,
+                )
+
+            # Dtypes that numba does not support
+            self.assertTrue(
+                np.allclose(ts.unfold_phase(y.astype(">f8")), yexp)
+            )
+            self.assertTrue(
+                np.allclose(
+                    ts.unfold_phase(y.astype(np.float16)), yexp, atol=1e-2
+                )
+            )
+            self.assertTrue(np.allclose(ts.unfold_phase(list(y)), yexp))
+
+            exp = ts.TimeSeries(self.times, np.exp(1j * self.times))
+            self.assertTrue(np.allclose(exp.unfolded_phase().y, self.times))
+
+            exp_single = ts.TimeSeries(
+                self.times, np.exp(1j * self.times).astype(np.complex64)
+            )
+            unfolded_single_numba = exp_single.unfolded_phase()
+
+        # The output dtype does not depend on the path
+        unfolded_single = exp_single.unfolded_phase()
+        self.assertEqual(unfolded_single.y.dtype, np.float32)
+        self.assertEqual(unfolded_single_numba.y.dtype, np.float32)
+        self.assertTrue(
+            np.allclose(unfolded_single_numba.y, unfolded_single.y)
+        )
+
     def test_to_FrequencySeries(self):
 
         # Test complex
@@ -1109,3 +1407,18 @@ class TestTimeseries(unittest.TestCase):
 
         self.assertTrue(np.allclose(rfs.f, rfreq))
         self.assertTrue(np.allclose(rfs.fft, rfft))
+
+        # Test single precision
+        fs_single = ts.TimeSeries(
+            self.times, (self.values + 1j * self.values).astype(np.complex64)
+        ).to_FrequencySeries()
+        self.assertEqual(fs_single.fft.dtype, np.complex64)
+        self.assertTrue(np.allclose(fs_single.f, freq))
+        self.assertTrue(np.allclose(fs_single.fft, fft, atol=1e-5))
+
+        rfs_single = ts.TimeSeries(
+            self.times, self.values.astype(np.float32)
+        ).to_FrequencySeries()
+        self.assertEqual(rfs_single.fft.dtype, np.complex64)
+        self.assertTrue(np.allclose(rfs_single.f, rfreq))
+        self.assertTrue(np.allclose(rfs_single.fft, rfft, atol=1e-5))